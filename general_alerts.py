@@ -32,6 +32,9 @@
 #
 # .\config\general_alerts.csv
 #
+# All file and directory names are relative to the directory 
+# containing this script rather than the current directory.
+#
 # This file is a csv file consisting of two lines. 
 # 
 # - Line one consists of the names of all ltla areas the user 
@@ -39,6 +42,8 @@
 #   area name eg.
 #
 #   Worthing,Arun,Adur,Horsham,Brighton and Hove,Crawley,Oxford,Norwich
+#
+#   Area names containing a comma must be quoted eg. "Bristol, City of".
 #   
 # - Line two contains the value of parameters used by the script.
 #   The format of the line is as follows:
@@ -80,94 +85,315 @@
 # -------
 #
 # This script logs error and status messages to the file .\log\log.txt an to the user console.
+# Messages are shown on the console as they are logged but are buffered before being 
+# written to the log file. The buffer is written when it is full, when an error is 
+# logged and when the script exits.
+#
+# Caching
+# -------
+#
+# Data retrieved through the COVID-19 API is cached in the directory .\cache. Cached
+# data is used for as long as the API's release timestamp is unchanged, so only the 
+# first run following each daily release retrieves all data. Setting the environment
+# variable COVID_ALERTS_REFRESH forces all data to be retrieved again. Cache files
+# which have not been updated for a week are removed.
 
 import calendar
 from colorama import init
-from datetime import date,timedelta
+from concurrent.futures import ThreadPoolExecutor,as_completed
+import csv
+from datetime import date
+import hashlib
+import json
+import logging
 import os
+import pickle
 import re
+import requests
+from requests.adapters import HTTPAdapter
 import subprocess
 import sys
 import time
+from pathlib import Path
+from urllib3.util.retry import Retry
 from uk_covid19 import Cov19API
 import utils as Utils
 from urllib.parse import urlencode
 import math
 
-# This procedure returns a date object from a 'datestamp'.
+# This procedure returns a date object from a 'datestamp'
+# in ISO format ( YYYY-MM-DD ).
 def ReturnDate(datestamp) :
 
     "This procedure returns a date object from a 'datestamp'"
     
-    list = datestamp.split('-')
-    year = int(list[0])
-    month = int(list[1])
-    day = int(list[2])
+    return date.fromisoformat(datestamp)
+
+# This procedure generates filters for a list of ltla 'area_names',
+# one filter for each area.
+def GenerateLTLAFilters(area_names) :
+
+    "This procedure generates filters for a list of ltla 'area_names'"
     
-    return date(year, month, day)
+    filters = []
+    for area in area_names : filters.append(['areaType=ltla','areaName=' + area])
+        
+    return filters
 
-# This procedure returns the positions of data fields
-# in 'structure'. 
+# This procedure checks the data 'area_data' retrieved for each of
+# the ltla areas in 'area_names' and orders the rows for each area 
+# by date, most recent first. Only the most recent 'case_count' 
+# rows with case data and 'death_count' rows with death data are
+# kept. A list of case rows and a list of death rows is returned
+# for each area in the same order as the areas in 'area_names'.
 #
 # Note: 
 # -----
-# This procedure is only valid if csv 
-# format data is requested.
-def ReturnFieldPostions(structure) :
+# Area names containing a comma must be quoted in the 
+# configuration file eg. "Bristol, City of".
+def ReturnLTLAData(area_data,area_names,case_count,death_count) :
+
+    "This procedure checks the data 'area_data' retrieved for each of the ltla areas in 'area_names'"
+    
+    data = []
+    for area, area_rows in zip(area_names,area_data) :
+        if ( len(area_rows) == 0 ) :
+            logger.error('No data retrieved for ltla area %s',area)
+            sys.exit()
+        area_rows.sort(key=lambda row : row['Date'],reverse=True)
+        case_rows = ReturnMetricRows(area_rows,'Cases',case_count)
+        death_rows = ReturnMetricRows(area_rows,'Deaths',death_count)
+        data.append([case_rows,death_rows])
+        
+    return data
 
-    "This procedure returns the position of data fields in 'structure'"
-    
-    position = {}
-    index = 0
+# This procedure returns the first 'count' rows in 'rows' which 
+# have a value for 'field'. Data for several metrics retrieved in a 
+# single request contains rows for every date on which any of the  
+# metrics has a value. Rows are ordered most recent first so only
+# the most recent 'count' rows are ever used.
+def ReturnMetricRows(rows,field,count) :
 
-    for field in structure : 
-        position[field] = index
-        index += 1
-    
-    return position
+    "This procedure returns the first 'count' rows in 'rows' which have a value for 'field'"
     
-# This procedure generates filters for a 'list' of ltla areas
-def GenerateLTLAFilters(list) :
+    metric_rows = []
+    for row in rows :
+        if ( len(metric_rows) == count ) : break
+        if ( row[field] is not None ) : metric_rows.append(row)
+        
+    return metric_rows
+
+# This procedure parses csv format data 'lines' retrieved using
+# 'data_structure' into a list of rows, one for each line of data.
+# The first line is the csv header line. Each row is a dictionary 
+# keyed by the field names in 'data_structure'. Each response is 
+# parsed only once. Numeric values are converted to floats and empty
+# values to None. Dates and area names are left as strings.
+def ReturnDataRows(lines,data_structure) :
+
+    "This procedure parses csv format data 'lines' retrieved using 'data_structure' into a list of rows"
+    
+    text_metrics = ['date','areaName']
+    
+    # Skip header line. Quoted values such as area names
+    # containing a comma are handled by the csv reader.
+    reader = csv.reader(lines)
+    next(reader,None)
+    
+    # Convert values
+    rows = []
+    for values in reader :
+        if ( len(values) == 0 ) : continue
+        row = dict(zip(data_structure,values))
+        for field, metric in data_structure.items() :
+            if ( field in row ) and not ( metric in text_metrics ) : 
+                if ( len(row[field]) != 0 ) : 
+                    row[field] = float(row[field])
+                else:
+                    row[field] = None
+        rows.append(row)
+        
+    return rows
 
-    "This procedure generates filters for a 'list' of ltla areas"
-    
-    filters = []
-    type = 'areaType=ltla'
+# This procedure returns the release timestamp of the data
+# available through the COVID-19 API. The timestamp is requested
+# through the shared 'Session' so the request has a timeout and is
+# retried like data requests. An empty string is returned if the 
+# timestamp cannot be retrieved.
+def ReturnReleaseTimestamp() :
 
-    for area in list : 
-        name = 'areaName=' + area
-        filter = [type,name]
-        filters.append(filter)
+    "This procedure returns the release timestamp of the data available through the COVID-19 API"
+    
+    try:
+        with Session.get(Cov19API.release_timestamp_endpoint,timeout=RequestTimeout) as response :
+            response.raise_for_status()
+            timestamp = response.json()['websiteTimestamp']
+    except ( requests.RequestException, ValueError, KeyError ) :
+        timestamp = empty
         
-    return filters
+    return timestamp
+    
+# This procedure returns the name of the cache file holding the
+# data for 'data_filter' and 'data_structure' with 'extension'.
+def ReturnCacheFilename(data_filter,data_structure,extension) :
 
-# This process will retrieve the data for 'data_filter' 
-# using format 'data_structure'. The process retrieves the
-# data in csv format and then splits the data into individual
-# lines. 
-def RetreiveCOVIDData(data_filter,data_structure) :
+    "This procedure returns the name of the cache file holding the data for 'data_filter' and 'data_structure'"
+    
+    key = hashlib.sha1(repr((CacheVersion,data_filter,sorted(data_structure.items()))).encode()).hexdigest()
+    
+    return str(CacheDir / (key + extension))
+    
+# This procedure returns the cached data rows for 'data_filter' and
+# 'data_structure'. Cached data is only returned if it was stored 
+# for the current release timestamp, otherwise 'failure' is returned.
+def ReadCachedCOVIDData(data_filter,data_structure) :
 
-    "This process will retrieve the data for 'data_filter' into using 'data_structure'"
+    "This procedure returns the cached data rows for 'data_filter' and 'data_structure'"
     
-    lines = []
+    if ( ForceRefresh ) or ( ReleaseTimestamp == empty ) : return failure
     
-    # Retrieve data
-    api = Cov19API(filters=data_filter,structure=data_structure)
+    # Check data was cached for the current release
+    StampFilename = ReturnCacheFilename(data_filter,data_structure,'.stamp')
+    StampFileObject = Utils.Open(StampFilename,read,failure)
+    if ( StampFileObject == failure ) : return failure
+    stamp = Utils.Read(StampFileObject,empty)
+    Utils.Close(StampFileObject,failure)
+    if ( stamp != ReleaseTimestamp ) : return failure
     
-    # Retreive data
+    # Load cached data
+    DataFilename = ReturnCacheFilename(data_filter,data_structure,'.pkl')
+    DataFileObject = Utils.Open(DataFilename,readbinary,failure)
+    if ( DataFileObject == failure ) : return failure
     try:
-        data = api.get_csv()
-        lines = data.splitlines()
-        lines.pop(0)
-                   
-    except:
-        ErrorMessage = 'Data retrieve failed for filter %s' % data_filter
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+        rows = pickle.load(DataFileObject)
+    except ( OSError, pickle.UnpicklingError, EOFError ) :
+        rows = failure
+    Utils.Close(DataFileObject,failure)
+    
+    return rows
+    
+# This procedure stores data 'rows' for 'data_filter' and 
+# 'data_structure' in the cache along with the current release 
+# timestamp. The timestamp is written last so incomplete data is 
+# never used.
+def WriteCachedCOVIDData(data_filter,data_structure,rows) :
+
+    "This procedure stores data 'rows' for 'data_filter' and 'data_structure' in the cache"
     
-    return lines
+    if ( ReleaseTimestamp == empty ) : return failure
+    
+    # Store data
+    DataFilename = ReturnCacheFilename(data_filter,data_structure,'.pkl')
+    DataFileObject = Utils.Open(DataFilename,overwritebinary,failure)
+    if ( DataFileObject == failure ) : return failure
+    try:
+        pickle.dump(rows,DataFileObject)
+    except ( OSError, pickle.PicklingError ) :
+        Utils.Close(DataFileObject,failure)
+        return failure
+    Utils.Close(DataFileObject,failure)
+    
+    # Store release timestamp
+    StampFilename = ReturnCacheFilename(data_filter,data_structure,'.stamp')
+    StampFileObject = Utils.Open(StampFilename,overwrite,failure)
+    if ( StampFileObject == failure ) : return failure
+    Utils.Write(StampFileObject,ReleaseTimestamp,failure)
+    Utils.Close(StampFileObject,failure)
+    
+    return success
+
+# This procedure removes files in the cache directory which have
+# not been updated for 'lifetime' days. Files for the data currently
+# requested are rewritten after each release so only files left by
+# changed filters or structures are removed.
+def RemoveStaleCachedCOVIDData(lifetime) :
+
+    "This procedure removes files in the cache directory which have not been updated for 'lifetime' days"
+    
+    oldest = time.time() - (lifetime*24*60*60)
+    for CacheFilename in CacheDir.iterdir() :
+        try:
+            if ( CacheFilename.stat().st_mtime < oldest ) : CacheFilename.unlink()
+        except OSError :
+            logger.warning('Could not remove stale cache file %s',CacheFilename)
+
+# This procedure requests the data for 'data_filter' using 
+# format 'data_structure'. The data is requested from the API
+# endpoint in compressed csv format, one page at a time, and each
+# page is parsed into rows as it is streamed so the response is 
+# never held as a single string. Each streamed response is closed
+# once its page is parsed, or if the request or parsing fails. 
+# Requests are made through the shared 'Session' so connections to
+# the API are reused. Data 
+# cached for the current release is used in preference to a new
+# request. Any exception raised by the request is passed back to
+# the caller.
+def RequestCOVIDData(data_filter,data_structure) :
+
+    "This procedure requests the data for 'data_filter' using 'data_structure'"
+    
+    # Use cached data if available
+    rows = ReadCachedCOVIDData(data_filter,data_structure)
+    if ( rows != failure ) : return rows
+    
+    # Request data. The API returns 'no content' once
+    # all pages have been retrieved.
+    parameters = {
+        'filters': ';'.join(data_filter),
+        'structure': json.dumps(data_structure,separators=(',',':')),
+        'format': 'csv',
+        'page': 1
+    }
+    
+    rows = []
+    while True :
+        with Session.get(COVIDDataEndpoint,params=parameters,stream=True,timeout=RequestTimeout) as response :
+            response.raise_for_status()
+            if ( response.status_code == NoContent ) : break
+            response.encoding = 'utf-8'
+            rows.extend(ReturnDataRows(response.iter_lines(decode_unicode=True),data_structure))
+        parameters['page'] += 1
+    
+    # Cache data
+    WriteCachedCOVIDData(data_filter,data_structure,rows)
+    
+    return rows
+
+# This process will retrieve the data for each ( filter, structure )
+# request in 'data_requests'. The requests are made concurrently using
+# up to 'max_workers' threads as they are dominated by network 
+# latency. The rows of data for each request are returned in the
+# same order as 'data_requests'.
+def RetreiveAllCOVIDData(data_requests,max_workers) :
+
+    "This process will retrieve the data for each ( filter, structure ) request in 'data_requests'"
+    
+    all_rows = [[] for data_request in data_requests]
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor :
+    
+        # Submit requests
+        futures = {}
+        for index, (data_filter,data_structure) in enumerate(data_requests) :
+            future = executor.submit(RequestCOVIDData,data_filter,data_structure)
+            futures[future] = index
+        
+        # Collect data as each request completes
+        for future in as_completed(futures) :
+            index = futures[future]
+            try:
+                all_rows[index] = future.result()
+                
+            except requests.RequestException :
+                logger.error('Data retrieve failed for filter %s',data_requests[index][0])
+                sys.exit()
+    
+    return all_rows
     
 # This procedure returns data lists from 'data' allowing calculation.
-# of 'rolling' averages.
+# of rolling averages. 'indices' are the positions in 'data' of the 
+# start of each rolling period, calculated once for the configured
+# rolling period.
 #
 # Notes: 
 # -----
@@ -175,17 +401,15 @@ def RetreiveCOVIDData(data_filter,data_structure) :
 #   is requested.
 #
 # - The order of the data is reversed ( to chronological order )
-def ReturnRollingSourceData(data,rolling) :
+def ReturnRollingSourceData(data,indices) :
 
-    "This procedure returns data lists from 'data' allowing calculation of 'rolling' period averages"
-    
-    sample = []   
-    sample = [data[rolling*2].split(','),data[rolling].split(','),data[0].split(',')]
+    "This procedure returns data lists from 'data' allowing calculation of rolling period averages"
     
-    return sample
+    return tuple(data[index] for index in indices)
 
-# This procedure will calculate the difference bewteen two rolling values
-# derived from three cumulative values as follows:
+# This procedure returns the penultimate and last rolling values
+# derived from three cumulative values of 'field' in 'lists' as 
+# follows:
 #
 #                      Specimen Date 1        Specimen Date 2        Specimen Date 3
 #                      |                      |                      | 
@@ -193,46 +417,54 @@ def ReturnRollingSourceData(data,rolling) :
 #                      |                      |                      |   
 # Cumulative value ->  A                      B                      C
 #
-# Rolling difference = (C-B)-(B-C) = C-2B+C
+# Penultimate rolling value = B-A
+# Last rolling value        = C-B
 #
-def ReturnRollingDifference(lists,position) :
-
-    "This procedure will return the difference between two rolling values"
-    
-    difference = float(lists[2][position]) - (2*(float(lists[1][position]))) + float(lists[0][position])
-    
-    return difference
-
-# This procedure returns the last rolling value derived from two cumulative values.
-def ReturnLastRollingValue(lists,position) :
-
-    "This procedure returns the last rolling value derived from two cumulative values"
-    
-    difference = 0
-    
-    if ( len(lists[2][position]) != 0 ) and ( len(lists[1][position]) != 0 ) :
-        difference = (float(lists[2][position]) - float(lists[1][position]))
-    else:
-        print(lists)
-    
-    return difference
-    
-# This procedure returns the penultimate rolling value derived from two cumulative values.
-def ReturnPenultimateRollingValue(lists,position) :
-
-    "This procedure returns the last rolling value derived from two cumulative values"
-    
-    difference = 0
-    
-    if ( len(lists[1][position]) != 0 ) and ( len(lists[0][position]) != 0 ) :
-        difference = (float(lists[1][position]) - float(lists[0][position]))
-    else :
-        print(lists)
-    
-    return difference
+# The difference between the two rolling values, (C-B)-(B-A) = C-2B+A,
+# is the increase in the rolling value. A rolling value of 0 is 
+# returned, and a warning logged, if either of its cumulative 
+# values is missing.
+def ReturnRollingValues(lists,field) :
+
+    "This procedure returns the penultimate and last rolling values derived from three cumulative values"
+    
+    values = [0,0]
+    
+    for period in range (0,2,1) :
+        start = lists[period][field]
+        end = lists[period+1][field]
+        if ( start is not None ) and ( end is not None ) :
+            values[period] = end - start
+        else:
+            logger.warning('The %s for the rolling period ending on %s could not be calculated as data is missing',field,lists[period+1]['Date'])
+    
+    return values
+    
+# This procedure raises any alerts required for the rolling values
+# of 'field' in 'lists'. Alerts are raised if the increase in the 
+# rolling value is greater than 'increase_limit' or if the last
+# rolling value is greater than 'limit'. 'description' describes 
+# the rolling value in alert messages eg. 'rolling number of cases 
+# for Worthing'. The increase and last rolling values are returned.
+def RaiseRollingAlerts(lists,field,increase_limit,limit,description) :
+
+    "This procedure raises any alerts required for the rolling values of 'field' in 'lists'"
+    
+    date = lists[-1]['Date']
+    [penultimate,last] = ReturnRollingValues(lists,field)
+    increase = last - penultimate
+    
+    if ( increase > increase_limit ) :
+        logger.warning('The %s on %s increased by %i which is greater than %i',description,date,increase,increase_limit)
+        
+    if ( last > limit ) :
+        logger.warning('The %s on %s was %i which is greater than %i',description,date,last,limit)
+        
+    return [increase,last]
     
 # This procedure returns the diference in rolling rates of
-# positive tests  
+# positive tests. A rate of 0 is returned for a rolling period 
+# in which no tests were recorded.
 def ReturnRollingPositiveRates(lists,cases,test1,test2) :
 
     "This procedure returns the diference in rolling rates of positive tests"
@@ -240,12 +472,13 @@ def ReturnRollingPositiveRates(lists,cases,test1,test2) :
     last_rate = 0.0
     penultimate_rate = 0.0
     
-    last_cases = ReturnLastRollingValue(lists,cases) 
-    penultimate_cases =  ReturnPenultimateRollingValue(lists,cases)
-    last_tests = ReturnLastRollingValue(lists,test1) + ReturnLastRollingValue(lists,test2)
-    penultimate_tests = ReturnPenultimateRollingValue(lists,test1) + ReturnPenultimateRollingValue(lists,test2)
-    last_rate = (last_cases/last_tests)*100
-    penultimate_rate = (penultimate_cases/penultimate_tests)*100
+    [penultimate_cases,last_cases] = ReturnRollingValues(lists,cases) 
+    [penultimate_test1,last_test1] = ReturnRollingValues(lists,test1)
+    [penultimate_test2,last_test2] = ReturnRollingValues(lists,test2)
+    last_tests = last_test1 + last_test2
+    penultimate_tests = penultimate_test1 + penultimate_test2
+    if ( last_tests != 0 ) : last_rate = (last_cases/last_tests)*100
+    if ( penultimate_tests != 0 ) : penultimate_rate = (penultimate_cases/penultimate_tests)*100
     
     return [penultimate_rate,last_rate]
     
@@ -284,29 +517,14 @@ def ReturnExponentialData(data,rolling,position) :
     "This procedure returns a data list from 'data' containing the natural logs of the the data values at 'position' in the 'data' lines"
     
     # Set intial values
-    first = True
     derived = {'Increasing': False,'Exponentials':[]}
+    values = [data[index][position] for index in range (0,rolling,1)]
     
     # Calcluate natural log values
-    stop = rolling
-    
-    for index in range (0,stop,1) : 
-        datum = data[index][position]
-        value  = float(datum)
-        # Save first value in order to determine if
-        # data value increasing      
-        if (first) :
-            first_value = value
-            first = False
-           
-        # Calculate exponential           
-        if (value > 0.0 ) : 
-            exponential = math.log(value)
-            derived['Exponentials'].append(exponential)
+    derived['Exponentials'] = [math.log(value) for value in values if ( value > 0.0 )]
     
     # Determine if value increaseing
-    last_value = value
-    if (last_value > first_value) : derived['Increasing'] = True
+    if ( values[-1] > values[0] ) : derived['Increasing'] = True
     
     return derived
 
@@ -316,14 +534,8 @@ def IsGrowthExponential(logs,limit) :
 
     "This procedure calculates the natural log differences between successive data values and determines how many are above an below the average value."
 
-    # Set intial values
-    derived = {'Above':0,'Below':0,'Exponential':False}
-    increments = []
-    
     # Calculate increments in natural log values
-    for index in range (0,(len(logs)-1),1) :
-        increment = logs[index+1] - logs[index]
-        increments.append(increment)
+    increments = [later - earlier for earlier, later in zip(logs,logs[1:])]
      
     # Caculate average increment
     if ( len(increments) > 0 ) : 
@@ -332,47 +544,43 @@ def IsGrowthExponential(logs,limit) :
         average = 0
     
     # Count 'above' and 'below' average values
+    above = below = 0
     for increment in increments :
-        if ( increment > average ) : derived['Above'] = derived['Above'] + 1
-        if ( increment < average ) : derived['Below'] = derived['Below'] + 1
+        if ( increment > average ) : above += 1
+        elif ( increment < average ) : below += 1
         
     # Determine if difference in above and below average
     # values is within limit.
-    difference = abs(derived['Above'] - derived['Below'])
-    if ( difference <= limit ) : derived['Exponential'] = True
+    exponential = ( abs(above - below) <= limit )
     
-    return derived
+    return {'Above':above,'Below':below,'Exponential':exponential}
 
 # This procedure calculates rolling average data for the value 
-# at index value in lines. A date string is also extractd from index
-# date in lines. The average is calulate to include values samples
-# before to there samples after
-def Return7DayRollingAverageData(lines,value,date) :
+# in field value in rows. A date string is also extractd from field
+# date in rows. The average is calulate to include values samples
+# before to there samples after. The 7 day total is kept as a
+# running sum which is updated as each sample is reached rather
+# than being recalculated for every sample.
+def Return7DayRollingAverageData(rows,value,date) :
     
-    "This procedure calculates rolling average data for the value at position in data"
+    "This procedure calculates rolling average data for the value field in data"
 
-    # Intialize values
-    data_lists = []
-    
-    # Create data lists
-    for line in lines :
-        data_list = line.split(',')
-        data_lists.append(data_list)
- 
     # Initialize return values
     averages = []
     
+    # Calculate total for the first ( oldest ) sample
+    first = len(rows)-4
+    if ( first < 3 ) : return averages
+    total = 0
+    for point in range (first+3,first-4,-1) : total = total + rows[point][value]
+    
     # Create rolling data
-    for index in range ((len(data_lists)-4),0,-1) :
-
-        # Caculate sum and average total
-        sum = 0 
-        sample_date = data_lists[index][date]
-        
-        if ( index > 2 ) : 
-            for point in range (index+3,index-4,-1) : sum = sum + int(data_lists[point][value])
-            average = float(sum/7)
-            averages.append([sample_date,average])
+    for index in range (first,2,-1) :
+    
+        # Update total and caculate average 
+        if ( index < first ) : total = total + rows[index-3][value] - rows[index+4][value]
+        average = float(total/7)
+        averages.append([rows[index][date],average])
             
     return averages
             
@@ -381,13 +589,15 @@ def Return7DayRollingAverageData(lines,value,date) :
 ############
 
 # File names and modes
-Currentdir = os.getcwd()
-LogDir = Currentdir + '\\log'
-ErrorFilename = LogDir + '\\' + 'log.txt'
-ConfigDir = Currentdir + '\\config'
-ConfigurationFilename = ConfigDir + '\\' + 'general_alerts.csv'
+BaseDir = Path(__file__).resolve().parent
+LogDir = BaseDir / 'log'
+ErrorFilename = LogDir / 'log.txt'
+ConfigDir = BaseDir / 'config'
+ConfigurationFilename = ConfigDir / 'general_alerts.csv'
+CacheDir = BaseDir / 'cache'
 append = 'a'
 read = 'r'
+readbinary = 'rb'
 overwrite = 'w'
 overwritebinary = 'wb'
 
@@ -396,20 +606,39 @@ invalid = failure = 0
 empty = ''
 success = 1
 
-# Error levels
-error = 'ERROR'
-warning = 'WARNING'
-info = 'INFO'
-
 # Script names
 module = 'general_alerts.py'
 
+# API request settings
+COVIDDataEndpoint = 'https://api.coronavirus.data.gov.uk/v1/data'
+RequestHeaders = {'Accept-Encoding': 'gzip, deflate'}
+RequestTimeout = 20
+NoContent = 204
+
+# API request retry settings. Requests failing with these
+# transient statuses are retried with exponential backoff.
+RequestRetries = 5
+RequestBackoff = 0.5
+RetryStatuses = [429,500,502,503,504]
+
+# Maximum number of concurrent API requests
+MaxWorkers = 8
+
+# Number of log entries buffered before being written to the log file
+LogCapacity = 512
+
+# Cache file format version. This must be changed whenever 
+# the format of cached data is changed.
+CacheVersion = 3
+
+# Number of days after which cache files that have not been updated are removed
+CacheLifetime = 7
+
 # Configuration file parameters
 ConfigFileLength = 2
 MinAreas = 1
 NoOfparameters = 12
-comma = ','
-space = ' '
+NumericParameter = re.compile(r'^\d+(\.\d+)?$')
 
 # Initialize coloured text
 init()
@@ -432,20 +661,19 @@ overview_structure = {
     "New": "newCasesByPublishDate"
 }
 
-# Generate field position information
-overview_field_positions = ReturnFieldPostions(overview_structure)
-
 # Define latest area cases structure
 area_latest_structure = {
     "Date":"date",
     "Cases":"newCasesByPublishDate"
 }
 
-# Define area structure    
-area_structure = {
+# Define ltla structure. Cases and deaths are retrieved in the
+# same request.
+ltla_structure = {
     "Date": "date",
     "Cases":"cumCasesBySpecimenDate",
-    "New":"newCasesBySpecimenDate"
+    "New":"newCasesBySpecimenDate",
+    "Deaths":"cumDeaths28DaysByPublishDate"
 }
 
 # Define latest area deaths structure
@@ -454,79 +682,68 @@ death_latest_structure = {
     "Cases":"newDeaths28DaysByPublishDate"
 }
 
-# Define death structure
-death_structure = {
-    "Date": "date",
-    "Cases":"cumDeaths28DaysByPublishDate"
-}
-
-# Generate field position information
-area_field_positions = ReturnFieldPostions(area_structure)
-death_field_positions = ReturnFieldPostions(death_structure)
-
-# Create/open log file
-ErrorFileObject = Utils.Open(ErrorFilename,append,failure)
-ErrorMessage = 'Could not open ' + ErrorFilename
-if ( ErrorFileObject == failure ) : Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+# Create/open log file. Buffered log entries are written
+# to the log file when the script exits.
+logger = Utils.Openlog(str(ErrorFilename),module,LogCapacity,failure)
+if ( logger == failure ) :
+    print ('Could not open %s' % ErrorFilename)
+    sys.exit()
 
 # Log start of script
-Utils.Logerror(ErrorFileObject,module,'Started',info)
+logger.info('Started')
 
 # Log progress messages
-ErrorMessage = 'Reading configuration file %s ' % ConfigurationFilename
-Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
+logger.info('Reading configuration file %s ',ConfigurationFilename)
 
 # Open and parse configuration file
-ConfigurationFileObject = Utils.Open(ConfigurationFilename,read,failure)
-ErrorMessage = 'Could not open configuration file ' + ConfigurationFilename
-if ( ConfigurationFileObject == failure ) : Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+ConfigurationFileObject = Utils.Open(str(ConfigurationFilename),read,failure)
+if ( ConfigurationFileObject == failure ) :
+    logger.error('Could not open configuration file %s',ConfigurationFilename)
+    sys.exit()
 
 # Read configuration file
 ConfigurationFileData = Utils.Read(ConfigurationFileObject,empty)
 if ( ConfigurationFileData != empty ) : 
-    ConfigurationFileDataLines = ConfigurationFileData.splitlines()
+    ConfigurationFileDataLines = list(csv.reader(ConfigurationFileData.splitlines()))
 else:
-    ErrorMessage = 'No data in ' + ConfigurationFilename
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+    logger.error('No data in %s',ConfigurationFilename)
+    sys.exit()
 
 # Parse and store configuration items 
 if ( len(ConfigurationFileDataLines) < ConfigFileLength ) : 
-    ErrorMessage = 'The configuration file %s has less than %s lines' % (ConfigurationFilename,ConfigFileLength)
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+    logger.error('The configuration file %s has less than %s lines',ConfigurationFilename,ConfigFileLength)
+    sys.exit()
 
-# Parse and store areas
-areas =  ConfigurationFileDataLines[0].split(',')
-if ( len(areas) < MinAreas ) or ( not ( comma in ConfigurationFileDataLines[0] ) ) : 
-    ErrorMessage = 'line 1 of configuration file %s contains fewer than %s ltla area names' % (ConfigurationFilename,MinAreas)
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
-    
-for area in areas :
-    if ( len(area.replace(space,empty)) == 0 ) :
-        ErrorMessage = 'line 1 of configuration file %s contains an area name of 0 length' % (ConfigurationFilename)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+# Parse and store areas. Surrounding spaces are removed from
+# area names so they match the names used by the API.
+areas = [area.strip() for area in ConfigurationFileDataLines[0]]
+if ( len(areas) < MinAreas ) : 
+    logger.error('line 1 of configuration file %s contains fewer than %s ltla area names',ConfigurationFilename,MinAreas)
+    sys.exit()
     
-# Construct area filters
-area_filters = GenerateLTLAFilters(areas)
+if not all(areas) :
+    logger.error('line 1 of configuration file %s contains an area name of 0 length',ConfigurationFilename)
+    sys.exit()
     
 # Parse and store parameters
-parameters = (ConfigurationFileDataLines[1].replace(space,empty)).split(',')
-
-if ( len(parameters) != NoOfparameters ) or ( not ( comma in ConfigurationFileDataLines[1] ) ) :
-    ErrorMessage = 'Line 2 of configuration file %s does not contain exactly %s parameters' % (ConfigurationFilename,NoOfparameters)
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
-
-for parameter in parameters :
-    if ( len(parameter) == 0 ) :
-        ErrorMessage = 'line 2 of configuration file %s contains a paramter value of 0 length' % (ConfigurationFilename)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
-    if not (bool(re.match("^\d*\.?\d*$",parameter))) : 
-        ErrorMessage = 'line 2 of configuration file %s contains a paramter %s which is non numeric' % (ConfigurationFilename,parameter)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+parameters = [parameter.strip() for parameter in ConfigurationFileDataLines[1]]
+
+if ( len(parameters) != NoOfparameters ) :
+    logger.error('Line 2 of configuration file %s does not contain exactly %s parameters',ConfigurationFilename,NoOfparameters)
+    sys.exit()
+
+invalid_parameter = next((parameter for parameter in parameters if not NumericParameter.match(parameter)),None)
+if ( invalid_parameter == empty ) :
+    logger.error('line 2 of configuration file %s contains a paramter value of 0 length',ConfigurationFilename)
+    sys.exit()
+if ( invalid_parameter is not None ) : 
+    logger.error('line 2 of configuration file %s contains a paramter %s which is non numeric',ConfigurationFilename,invalid_parameter)
+    sys.exit()
         
 Rolling = int(parameters[0])
 if ( Rolling <= 0 ) :
-    ErrorMessage = 'A Rolling period value of 0 is not permitted'
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,error)
+    logger.error('A Rolling period value of 0 is not permitted')
+    sys.exit()
 
 RollingCasesIncreaseLimit = int(parameters[1])
 RollingCasesLimit = int(parameters[2])    
@@ -539,14 +756,52 @@ LTLARollingCasesLimit = int(parameters[8])
 LTLARollingDeathsIncreaseLimit = int(parameters[9])
 LTLARollingDeathsLimit = int(parameters[10])
 ExponentialSensitivity = int(parameters[11])
+
+# Number of most recent ltla rows required to calculate rolling 
+# values and, for cases, latest possible 7 day case number averages
+CaseSampleSize = max((2*Rolling)+1,(2*7)-1)
+DeathSampleSize = (2*Rolling)+1
+
+# Positions of the rows used to calculate rolling values, 
+# in chronological order
+SampleIndices = (Rolling*2,Rolling,0)
+
+# Define UK rolling alerts. Each alert consists of the data field,
+# the rolling increase limit, the rolling limit, the name used
+# in alert messages and summary data and the level at which the
+# average daily value is logged when the rolling limit is exceeded.
+uk_alerts = [
+    ['Cases',RollingCasesIncreaseLimit,RollingCasesLimit,'cases',logging.INFO],
+    ['Deaths',RollingDeathsIncreaseLimit,RollingDeathsLimit,'deaths',logging.WARNING]
+]
     
 # Close Configuration file
-ErrorMessage = 'Could not close ' + ConfigurationFilename
-if ( Utils.Close(ConfigurationFileObject,failure) == failure ) : Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+if ( Utils.Close(ConfigurationFileObject,failure) == failure ) : logger.warning('Could not close %s',ConfigurationFilename)
+
+# Prepare API session. A connection pool large enough for all
+# concurrent requests is used so no connection is discarded.
+# Transient failures are retried before a request fails.
+Session = requests.Session()
+Session.headers.update(RequestHeaders)
+retries = Retry(total=RequestRetries,backoff_factor=RequestBackoff,status_forcelist=RetryStatuses,respect_retry_after_header=True)
+Session.mount('https://',HTTPAdapter(pool_connections=MaxWorkers,pool_maxsize=MaxWorkers,max_retries=retries))
+
+# Prepare data cache
+ForceRefresh = ( 'COVID_ALERTS_REFRESH' in os.environ )
+ReleaseTimestamp = ReturnReleaseTimestamp()
+if ( ReleaseTimestamp == empty ) :
+    logger.warning('Could not retrieve the data release timestamp, cached data will not be used')
+
+try:
+    CacheDir.mkdir(exist_ok=True)
+except OSError :
+    ReleaseTimestamp = empty
+    logger.warning('Could not create cache directory %s, cached data will not be used',CacheDir)
+else:
+    RemoveStaleCachedCOVIDData(CacheLifetime)
 
 # Log progress messages
-ErrorMessage = 'Processing overview data'
-Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
+logger.info('Processing overview data')
 
 # Initialize average data
 dailySummary = []
@@ -571,87 +826,65 @@ dailyValues['area'] = 'UK'
 rollingValues['area'] = 'UK'
 cumulativeValues['area'] = 'UK'
 
-# Retrieve overview data
-data_lines = RetreiveCOVIDData(overview_filter,overview_structure)
-
-# Remove lines with null death data.
+# Retrieve overview and ltla data. Data for each configured
+# ltla area is retrieved in a separate request.
+data_requests = [(overview_filter,overview_structure)]
+for ltla_filter in GenerateLTLAFilters(areas) : data_requests.append((ltla_filter,ltla_structure))
+all_data = RetreiveAllCOVIDData(data_requests,MaxWorkers)
+overview_rows = all_data[0]
+ltla_data = all_data[1:]
+
+# Find the first row with death data and the first row from
+# there with testing data in a single pass. Earlier rows contain
+# null data.
 # Data issue 11-13/05/2022
+deaths_start = tests_start = len(overview_rows)
+for index, data_row in enumerate(overview_rows) : 
+    if ( deaths_start > index ) and ( data_row['Deaths'] is not None ) : deaths_start = index
+    if ( deaths_start <= index ) and ( data_row['PillarOneTests'] is not None ) : 
+        tests_start = index
+        break
 
-valid_data_start = 0
-for data_line in data_lines : 
-    data_list = data_line.split(',')
-    if ( len(data_list[overview_field_positions['Deaths']]) != 0 ) : break
-    valid_data_start += 1
-
-del data_lines[0:valid_data_start]
+# Select rows following null death data.
+data_rows = overview_rows[deaths_start:]
 
 # Extract data required to calculate rolling values
-data_lists = ReturnRollingSourceData(data_lines,Rolling)
-LastRollingDate = data_lists[len(data_lists)-1][overview_field_positions['Date']]
-
-# Raise any rolling cases alarm(s) required
-RollingCasesIncrease = ReturnRollingDifference(data_lists,overview_field_positions['Cases'])
-if ( RollingCasesIncrease > RollingCasesIncreaseLimit ) : 
-    rollingValues['cases_increase'] = str(RollingCasesIncrease)
-    ErrorMessage = 'The rolling number of cases for the UK on %s increased by %i which is greater than %i' % (LastRollingDate,RollingCasesIncrease,RollingCasesIncreaseLimit) 
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    
-LastRollingCases = ReturnLastRollingValue(data_lists,overview_field_positions['Cases'])
-if ( LastRollingCases > RollingCasesLimit ) : 
-   rollingValues['cases'] = str(LastRollingCases)
-   ErrorMessage = 'The rolling number of cases for the UK on %s was %i which is greater the %i' % (LastRollingDate,LastRollingCases,RollingCasesLimit)
-   Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-   dailyValues['cases'] = str(LastRollingCases/Rolling)
-   ErrorMessage = 'The average daily case rate in the UK on %s was %i ' % (LastRollingDate,(LastRollingCases/Rolling))
-   Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
-
-# Raise any rolling death alarm(s) required
-RollingDeathsIncrease = ReturnRollingDifference(data_lists,overview_field_positions['Deaths'])
-if ( RollingDeathsIncrease > RollingDeathsIncreaseLimit ) :  
-    rollingValues['deaths_increase'] = str(RollingDeathsIncrease)
-    ErrorMessage = 'The rolling number of deaths on %s increased by %i which is greater than %i' % (LastRollingDate,RollingDeathsIncrease,RollingDeathsIncreaseLimit)
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-
-LastRollingDeaths = ReturnLastRollingValue(data_lists,overview_field_positions['Deaths'])
-if ( LastRollingDeaths > RollingDeathsLimit ) :  
-    rollingValues['deaths'] = str(LastRollingDeaths)
-    ErrorMessage = 'The rolling number of deaths on %s was %i which is greater than %i' % (LastRollingDate,LastRollingDeaths,RollingDeathsLimit)
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    dailyValues['deaths'] = str(LastRollingDeaths/Rolling)
-    ErrorMessage = 'The average daily death rate on %s was %i ' % (LastRollingDate,(LastRollingDeaths/Rolling))
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    
-# Remove lines with null testing data.
-valid_data_start = 0
-for data_line in data_lines : 
-    data_list = data_line.split(',')
-    if ( len(data_list[overview_field_positions['PillarOneTests']]) != 0 ) : break
-    valid_data_start += 1
-
-del data_lines[0:valid_data_start]
+data_lists = ReturnRollingSourceData(data_rows,SampleIndices)
+LastRollingDate = data_lists[-1]['Date']
+
+# Raise any rolling case and death alarm(s) required
+for [field,increase_limit,limit,name,level] in uk_alerts :
+    description = 'rolling number of %s for the UK' % name
+    [RollingIncrease,LastRolling] = RaiseRollingAlerts(data_lists,field,increase_limit,limit,description)
+    if ( RollingIncrease > increase_limit ) : rollingValues[name + '_increase'] = str(RollingIncrease)
+    if ( LastRolling > limit ) : 
+        rollingValues[name] = str(LastRolling)
+        dailyValues[name] = str(LastRolling/Rolling)
+        logger.log(level,'The average daily number of %s for the UK on %s was %i ',name,LastRollingDate,(LastRolling/Rolling))
+    
+# Select rows following null testing data.
+data_rows = overview_rows[tests_start:]
         
 # Extract data required to calculate rolling values
-data_lists = ReturnRollingSourceData(data_lines,Rolling)
-LastRollingDate = data_lists[len(data_lists)-1][overview_field_positions['Date']]    
+data_lists = ReturnRollingSourceData(data_rows,SampleIndices)
+LastRollingDate = data_lists[-1]['Date']    
   
 # Raise any rolling positive rate alarm(s) required
-RollingPositiveRates = ReturnRollingPositiveRates(data_lists,overview_field_positions['Cases'],overview_field_positions['PillarOneTests'],overview_field_positions['PillarTwoTests'])
+RollingPositiveRates = ReturnRollingPositiveRates(data_lists,'Cases','PillarOneTests','PillarTwoTests')
 RollingPositiveRateIncrease = ( RollingPositiveRates[1] - RollingPositiveRates[0] )
 if ( RollingPositiveRateIncrease > RollingPositiveRateIncreaseLimit ) :
     rollingValues['positives_increase'] = str(RollingPositiveRateIncrease)
-    ErrorMessage = 'The increase in rolling positive test rate on %s was %4.2f which is greater than %4.2f' % (LastRollingDate,float(RollingPositiveRateIncrease),float(RollingPositiveRateIncreaseLimit))
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+    logger.warning('The increase in rolling positive test rate on %s was %4.2f which is greater than %4.2f',LastRollingDate,float(RollingPositiveRateIncrease),float(RollingPositiveRateIncreaseLimit))
     
 LastRollingPositiveRate = RollingPositiveRates[1]
 if ( LastRollingPositiveRate > RollingPositiveRateLimit ) :
     rollingValues['positives'] = str(LastRollingPositiveRate)
-    ErrorMessage = 'The rolling positive test rate on %s was %4.2f which is greater than %4.2f ' % (LastRollingDate,float(LastRollingPositiveRate),float(RollingPositiveRateLimit))
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)  
+    logger.warning('The rolling positive test rate on %s was %4.2f which is greater than %4.2f ',LastRollingDate,float(LastRollingPositiveRate),float(RollingPositiveRateLimit))
 
 # Calculate latest possible 7 day case number averages
 sample_size = (2*7)-1
-rolling_lines = data_lines[0:sample_size]
-rolling_lists = Return7DayRollingAverageData(rolling_lines,overview_field_positions['New'],overview_field_positions['Date'])
+rolling_rows = data_rows[0:sample_size]
+rolling_lists = Return7DayRollingAverageData(rolling_rows,'New','Date')
 
 # Determine if there is exponential growth in case numbers.
 sample_date = rolling_lists[3][0]
@@ -659,51 +892,36 @@ exponential_data = ReturnExponentialData(rolling_lists,7,1)
 
 if (exponential_data['Increasing']) : 
     if (IsGrowthExponential(exponential_data['Exponentials'],ExponentialSensitivity)) : 
-        ErrorMessage = 'The R number for the UK on %s was greater than 1 ' % (sample_date)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+        logger.warning('The R number for the UK on %s was greater than 1 ',sample_date)
 
 # Store summary data
 rollingSummary.append(rollingValues)
 dailySummary.append(dailyValues)
       
 # Log progress messages
-ErrorMessage = 'Processing ltla data'
-Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
+logger.info('Processing ltla data')
  
-# Process area data
-area_number = 0
-
-for area_filter in area_filters :
+# Check and order ltla data for each area
+area_data = ReturnLTLAData(ltla_data,areas,CaseSampleSize,DeathSampleSize)
 
-    # Set area name
-    AreaName = areas[area_number]
+# Process area case and death data
+for AreaName, [case_rows,death_rows] in zip(areas,area_data) :
 
-    # Retrieve area data 
-    data_lines = RetreiveCOVIDData(area_filter,area_structure)
-            
     # Extract data required to calculate rolling values
-    data_lists = ReturnRollingSourceData(data_lines,Rolling)
-    LastRollingDate = data_lists[len(data_lists)-1][area_field_positions['Date']]
+    data_lists = ReturnRollingSourceData(case_rows,SampleIndices)
+    LastRollingDate = data_lists[-1]['Date']
     
     # Raise any rolling cases alarm(s) required
-    RollingCasesIncrease = ReturnRollingDifference(data_lists,area_field_positions['Cases'])
-    if ( RollingCasesIncrease > LTLARollingCasesIncreaseLimit ) : 
-        ErrorMessage = 'The rolling number of cases for %s on %s increased by %i which is greater than %i' % (AreaName,LastRollingDate,RollingCasesIncrease,LTLARollingCasesIncreaseLimit) 
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    
-    LastRollingCases = ReturnLastRollingValue(data_lists,area_field_positions['Cases'])
-    if ( LastRollingCases > LTLARollingCasesLimit ) : 
-        ErrorMessage = 'The rolling number of cases for %s on %s was %i which is greater the %i' % (AreaName,LastRollingDate,LastRollingCases,LTLARollingCasesLimit)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+    description = 'rolling number of cases for %s' % AreaName
+    [RollingCasesIncrease,LastRollingCases] = RaiseRollingAlerts(data_lists,'Cases',LTLARollingCasesIncreaseLimit,LTLARollingCasesLimit,description)
         
     if ( LastRollingCases == 0 ) : 
-        ErrorMessage = 'The rolling number of cases for %s on %s was 0' % (AreaName,LastRollingDate)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
+        logger.info('The rolling number of cases for %s on %s was 0',AreaName,LastRollingDate)
         
     # Calculate latest possible 7 day case number averages
     sample_size = (2*7)-1
-    rolling_lines = data_lines[0:sample_size]
-    rolling_lists = Return7DayRollingAverageData(rolling_lines,area_field_positions['New'],area_field_positions['Date'])
+    rolling_rows = case_rows[0:sample_size]
+    rolling_lists = Return7DayRollingAverageData(rolling_rows,'New','Date')
 
     # Determine if there is exponential growth in case numbers.
     sample_date = rolling_lists[3][0]
@@ -711,50 +929,23 @@ for area_filter in area_filters :
 
     if (exponential_data['Increasing']) : 
         if (IsGrowthExponential(exponential_data['Exponentials'],ExponentialSensitivity)) : 
-            ErrorMessage = 'The R number for area %s on %s was greater than 1 ' % (AreaName,sample_date)
-            Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    
-    area_number += 1
+            logger.warning('The R number for area %s on %s was greater than 1 ',AreaName,sample_date)
 
-# Process area death data
-area_number = 0
-
-for area_filter in area_filters :
-
-    # Set area name
-    AreaName = areas[area_number]
-
-    # Display latest death total
-    data_lines = RetreiveCOVIDData(area_filter,death_structure)
-    data_list = data_lines[0].split(',')
-    ErrorMessage = 'The total number of deaths for %s is now %s' % (AreaName,data_list[1])
-    Utils.Logerror(ErrorFileObject,module,ErrorMessage,info)
+    # Display latest area death total
+    logger.info('The total number of deaths for %s is now %i',AreaName,death_rows[0]['Deaths'])
             
     # Extract data required to calculate rolling values
-    data_lists = ReturnRollingSourceData(data_lines,Rolling)
-    LastRollingDate = data_lists[len(data_lists)-1][death_field_positions['Date']]
+    data_lists = ReturnRollingSourceData(death_rows,SampleIndices)
+    LastRollingDate = data_lists[-1]['Date']
     
     # Raise any rolling deaths alarm(s) required
-    RollingDeathsIncrease = ReturnRollingDifference(data_lists,death_field_positions['Cases'])
-    if ( RollingDeathsIncrease > LTLARollingDeathsIncreaseLimit ) : 
-        ErrorMessage = 'The rolling number of deaths for %s on %s increased by %i which is greater than %i' % (AreaName,LastRollingDate,RollingDeathsIncrease,LTLARollingDeathsIncreaseLimit) 
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
-    
-    LastRollingDeaths= ReturnLastRollingValue(data_lists,death_field_positions['Cases'])
-    if ( LastRollingDeaths> LTLARollingDeathsLimit ) : 
-        ErrorMessage = 'The rolling number of deaths for %s on %s was %i which is greater the %i' % (AreaName,LastRollingDate,LastRollingDeaths,LTLARollingDeathsLimit)
-        Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+    description = 'rolling number of deaths for %s' % AreaName
+    [RollingDeathsIncrease,LastRollingDeaths] = RaiseRollingAlerts(data_lists,'Deaths',LTLARollingDeathsIncreaseLimit,LTLARollingDeathsLimit,description)
         
-    if ( LastRollingDeaths== 0 ) : 
-        ErrorMessage = 'The rolling number of deaths for %s on %s was 0' % (AreaName,LastRollingDate)
-
-    area_number += 1
+    if ( LastRollingDeaths == 0 ) : 
+        logger.info('The rolling number of deaths for %s on %s was 0',AreaName,LastRollingDate)
     
 # Log end of script
-Utils.Logerror(ErrorFileObject,module,'Completed',info)
-
-# Close error log file
-ErrorMessage = 'Could not close ' + ErrorFilename
-if ( Utils.Close(ErrorFileObject,failure) == failure ) : Utils.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+logger.info('Completed')
 
 #print(Utils.ColourText('End',red))
\ No newline at end of file
@@ -1,3 +1,5 @@
+import logging
+import logging.handlers
 import subprocess
 import sys
 import time
@@ -80,6 +82,43 @@ def Logerror (Fileobject,module,text,level):
         if ( level == 'ERROR' ) : sys.exit()
 
 
+# Formats log entry times in the same way as time.asctime, as used
+# by Logerror. The day of the month is padded with a space.
+class AsctimeFormatter (logging.Formatter):
+
+    "Formats log entry times in the same way as time.asctime"
+    
+    def formatTime (self,record,datefmt=None):
+        return time.asctime(self.converter(record.created))
+
+# Opens log 'name'. Entries are written to the console as they are
+# logged and buffered, 'capacity' entries at a time, before being 
+# written to the log file 'filename'. The buffer is also written 
+# when an error is logged. Entries have the same format as those
+# written by Logerror.
+def Openlog (filename,name,capacity,failure):
+
+    "Opens a log"
+    
+    try:
+        filehandler = logging.FileHandler(filename)
+    except:
+        return failure
+    
+    formatter = AsctimeFormatter('%(asctime)s %(levelname)s: %(name)s: %(message)s')
+    filehandler.setFormatter(formatter)
+    bufferhandler = logging.handlers.MemoryHandler(capacity,target=filehandler)
+    consolehandler = logging.StreamHandler(sys.stdout)
+    consolehandler.setFormatter(formatter)
+    
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(bufferhandler)
+    logger.addHandler(consolehandler)
+    
+    return logger
+
 # Launches spreadsheet program with file argument
 def ViewSpeadsheet (spreadsheet,file) :
  